@@ -0,0 +1,313 @@
+import reportlab.rl_config
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Flowable
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from reportlab.lib.units import inch
+from io import BytesIO
+from PIL import Image as PILImage
+import os
+import re
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+# Only reportlab.graphics reads shapeChecking (at class definition), so this is a
+# no-op for the platypus flowables used here; kept as the requested default.
+reportlab.rl_config.shapeChecking = 0
+reportlab.rl_config.defaultPageSize = A4
+# Reports only use the built-in Times fonts, so never walk the disk for TTFs
+reportlab.rl_config.TTFSearchPath = ()
+
+# --- HELPER FUNCTIONS ---
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "IIT_Madras_Logo.png")
+LOGO_SIZE = 1.8 * inch
+
+@functools.lru_cache(maxsize=4)
+def load_logo(path=LOGO_PATH):
+    """
+    Read the logo once per process, downsampled to its drawn size at EMBED_DPI
+    so each report only embeds a small image. Returns None when the file is missing.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        img_buffer, _, _ = fit_image(f.read(), LOGO_SIZE)
+    return img_buffer.getvalue()
+
+_TAG_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)[^>]*>')
+_INLINE_TAGS = {'strong': 'b', 'b': 'b', 'em': 'i', 'i': 'i', 'u': 'u'}
+
+def _replace_tag(match):
+    closing, name = match.group(1), match.group(2).lower()
+    tag = _INLINE_TAGS.get(name)
+    if tag:
+        return f"<{closing}{tag}>"
+    if name == 'br' or (name == 'p' and not closing):
+        return "<br/>"
+    # Closing </p> and any tag ReportLab doesn't understand are dropped, text is kept.
+    return ""
+
+@functools.lru_cache(maxsize=512)
+def clean_html_for_reportlab(html_content):
+    """
+    Quill returns standard HTML (<b>, <i>, <p>). ReportLab uses a limited XML-like markup.
+    This function bridges the gap with a single regex pass instead of a full parse tree.
+    """
+    if not html_content:
+        return ""
+    clean_text = _TAG_RE.sub(_replace_tag, html_content)
+    # The first paragraph doesn't need a line break in front of it
+    return clean_text.removeprefix("<br/>")
+
+# Pixel density kept for uploaded images once they are scaled to the page width
+EMBED_DPI = 150
+# Pillow reports many phone and camera JPEGs as MPO (multi-picture JPEG)
+_JPEG_FORMATS = ('JPEG', 'MPO')
+
+def fit_image(image_bytes, avail_width):
+    """
+    Read the image size with Pillow and scale it down to fit avail_width, so
+    ReportLab gets explicit dimensions and doesn't have to parse the header itself.
+    JPEGs that already fit are passed through untouched, so ReportLab embeds
+    their DCT data as is; MPOs are cut down to their first frame as a plain
+    JPEG, since ReportLab only takes that fast path for format 'JPEG'.
+    Anything larger than the page can show at EMBED_DPI is downsampled, and
+    opaque photographic PNGs are transcoded to JPEG instead of going through
+    ReportLab's zlib pass.
+    """
+    img_buffer = BytesIO(image_bytes)
+    with PILImage.open(img_buffer) as pim:
+        width, height = pim.size
+        max_px = int(avail_width / inch * EMBED_DPI)
+        # Counting colours decodes and scans every pixel, so do it at most once
+        few_colors = pim.getcolors(256) is not None if _may_be_photo(pim) else None
+        is_photo = few_colors is False
+        if width > max_px or pim.format == 'MPO' or is_photo:
+            img_buffer = _reencode(pim, max_px, is_photo, few_colors)
+    img_buffer.seek(0)
+    if width > avail_width:
+        height = height * avail_width / width
+        width = avail_width
+    return img_buffer, width, height
+
+def _may_be_photo(pim):
+    # Opaque RGB/L PNGs with more than 256 colours: JPEG is much smaller and visually the same
+    return pim.format == 'PNG' and pim.mode in ('RGB', 'L') and 'transparency' not in pim.info
+
+def _reencode(pim, max_px, is_photo, few_colors):
+    fmt = pim.format
+    to_jpeg = fmt in _JPEG_FORMATS or is_photo
+    if not to_jpeg and few_colors is None and pim.mode in ('RGB', 'RGBA'):
+        # Count before resampling, which blends in new in-between colours
+        few_colors = pim.getcolors(256) is not None
+    if pim.width > max_px:
+        pim.thumbnail((max_px, pim.height), PILImage.LANCZOS)
+    out = BytesIO()
+    if to_jpeg:
+        # Saving as 'JPEG' writes only the current frame of an MPO
+        pim.save(out, 'JPEG', quality=85 if fmt in _JPEG_FORMATS else 88, optimize=True)
+    else:
+        # Flat graphics (charts, screenshots) fit in a palette without visible loss
+        if few_colors and pim.mode in ('RGB', 'RGBA'):
+            pim = pim.quantize(colors=256)
+        pim.save(out, 'PNG', optimize=True)
+    return out
+
+@functools.lru_cache(maxsize=1)
+def _build_styles():
+    """Build the report stylesheet once; every PDFGenerator shares it."""
+    styles = getSampleStyleSheet()
+    # Using Times-Roman family to match the screenshot
+    styles.add(ParagraphStyle(
+        name='CoverTitle', parent=styles['Title'], fontSize=18, leading=22,
+        alignment=TA_CENTER, spaceAfter=12, fontName='Times-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name='CoverSubtitle', parent=styles['Normal'], fontSize=14, leading=18,
+        alignment=TA_CENTER, spaceAfter=40, fontName='Times-Roman'
+    ))
+    styles.add(ParagraphStyle(
+        name='SubmittedByLabel', parent=styles['Normal'], fontSize=12, leading=16,
+        alignment=TA_CENTER, fontName='Times-Bold', spaceAfter=6
+    ))
+    styles.add(ParagraphStyle(
+        name='StudentInfo', parent=styles['Normal'], fontSize=12, leading=18,
+        alignment=TA_CENTER, fontName='Times-Roman'
+    ))
+    styles.add(ParagraphStyle(
+        name='InstituteInfo', parent=styles['Normal'], fontSize=12, leading=16,
+        alignment=TA_CENTER, fontName='Times-Roman'
+    ))
+    styles.add(ParagraphStyle(
+        name='CustomH1', parent=styles['Heading1'], fontSize=16, leading=20,
+        spaceBefore=20, spaceAfter=10, fontName='Times-Bold'
+    ))
+    
+    # Override BodyText
+    styles['BodyText'].fontSize = 11
+    styles['BodyText'].leading = 14
+    styles['BodyText'].alignment = TA_JUSTIFY
+    styles['BodyText'].fontName = 'Times-Roman'
+    return styles
+
+@functools.lru_cache(maxsize=1)
+def _build_toc_style():
+    return ParagraphStyle(fontName='Times-Bold', fontSize=12, name='TOCHeading1', leftIndent=20, firstLineIndent=-20, spaceBefore=5, leading=12)
+
+class TOCLine(Flowable):
+    """
+    One table of contents row. The heading's page number isn't known yet when
+    this is drawn, so it references a form XObject that ReportDocTemplate
+    fills in once the heading itself lands on a page. This resolves the TOC in
+    a single layout pass instead of multiBuild's repeated ones.
+    """
+    NUM_WIDTH = 0.5 * inch
+
+    def __init__(self, text, key, style):
+        super().__init__()
+        self.para = Paragraph(text, style)
+        self.key = key
+        self.style = style
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        _, self.height = self.para.wrap(availWidth - self.NUM_WIDTH, availHeight)
+        return self.width, self.height
+
+    def getSpaceBefore(self):
+        return self.style.spaceBefore
+
+    def draw(self):
+        self.para.drawOn(self.canv, 0, 0)
+        # Jump to the bookmark ReportDocTemplate sets where the heading lands
+        self.canv.linkRect("", self.key, (0, 0, self.width, self.height), relative=1)
+        self.canv.saveState()
+        # Baseline of the paragraph's last line, right edge of the frame
+        self.canv.translate(self.width, self.style.leading - self.style.fontSize)
+        self.canv.doForm(self.key)
+        self.canv.restoreState()
+
+class TOCHeading(Paragraph):
+    """A heading that ReportDocTemplate records for the table of contents."""
+    toc_key = None
+
+    def split(self, availWidth, availHeight):
+        parts = super().split(availWidth, availHeight)
+        # Only the first fragment marks where the heading starts
+        for i, part in enumerate(parts):
+            part.toc_key = self.toc_key if i == 0 else None
+        return parts
+
+class ReportDocTemplate(SimpleDocTemplate):
+    def afterFlowable(self, flowable):
+        key = getattr(flowable, 'toc_key', None)
+        if key is None:
+            return
+        canv = self.canv
+        style = _build_toc_style()
+        canv.bookmarkPage(key)
+        canv.beginForm(key, lowerx=-TOCLine.NUM_WIDTH, lowery=-style.fontSize, upperx=0, uppery=style.fontSize)
+        canv.setFont(style.fontName, style.fontSize)
+        canv.drawRightString(0, 0, str(canv.getPageNumber()))
+        canv.endForm()
+
+# Page geometry shared by every report. Spacers are still created per block:
+# ReportLab marks a flowable as _postponed when it pushes it to the next page,
+# so one instance can't safely appear more than once in a story.
+PAGE_HALF_W = A4[0] / 2.0
+AVAIL_WIDTH = A4[0] - 144
+FOOTER_Y_COVER = 0.75 * inch
+FOOTER_Y_CONTENT = 0.5 * inch
+FOOTER_FONT = 'Times-Roman'
+SPACE_AFTER_P = 0.1 * inch
+SPACE_AFTER_IMG = 0.2 * inch
+
+# Separate from the app's report pool, since generate() itself runs on that one
+_IMAGE_POOL = ThreadPoolExecutor(max_workers=4)
+
+class PDFGenerator:
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.styles = _build_styles()
+
+    def draw_cover_footer(self, canvas, doc):
+        canvas.saveState()
+        canvas.setFont(FOOTER_FONT, 11)
+        canvas.drawCentredString(PAGE_HALF_W, FOOTER_Y_COVER, "0")
+        canvas.restoreState()
+
+    def draw_content_footer(self, canvas, doc):
+        page_num = canvas.getPageNumber()
+        canvas.saveState()
+        canvas.setFont(FOOTER_FONT, 10)
+        canvas.drawCentredString(PAGE_HALF_W, FOOTER_Y_CONTENT, str(page_num))
+        canvas.restoreState()
+
+    def cover_page(self, metadata):
+        styles = self.styles
+        logo_bytes = load_logo()
+        if logo_bytes:
+            logo = [Image(BytesIO(logo_bytes), width=LOGO_SIZE, height=LOGO_SIZE)]
+        else:
+            # Fallback if file is missing
+            logo = [Paragraph("(Logo file not found)", styles['StudentInfo']), Spacer(1, 1.8*inch)]
+
+        return [
+            Spacer(1, 0.5*inch),
+            Paragraph(metadata['title'], styles['CoverTitle']),
+            Paragraph(metadata['subtitle'], styles['CoverSubtitle']),
+
+            Spacer(1, 0.8*inch),
+            Paragraph("Submitted by", styles['SubmittedByLabel']),
+            Paragraph(metadata['name'], styles['StudentInfo']),
+            Paragraph(metadata['roll_number'], styles['StudentInfo']),
+
+            Spacer(1, 1.0*inch),
+            *logo,
+
+            Spacer(1, 1.8*inch),
+            Paragraph("IITM Online BS Degree Program,", styles['InstituteInfo']),
+            Paragraph("Indian Institute of Technology, Madras, Chennai", styles['InstituteInfo']),
+            Paragraph("Tamil Nadu, India, 600036", styles['InstituteInfo']),
+            PageBreak(),
+        ]
+
+    def toc_page(self, headings):
+        style = _build_toc_style()
+        lines = [TOCLine(heading.text, heading.toc_key, style) for heading in headings]
+        return [Paragraph("Table of Contents", self.styles['Title']), *lines, PageBreak()]
+
+    def generate(self, metadata, content_items):
+        doc = ReportDocTemplate(
+            self.buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72
+        )
+
+        # --- DYNAMIC CONTENT ---
+        # Pillow releases the GIL while decoding, so fit all images up front on
+        # the pool; map() yields them in order as the loop below reaches them.
+        image_data = [item['bytes'] for item in content_items if item['type'] == 'image' and item['bytes']]
+        fitted_images = _IMAGE_POOL.map(fit_image, image_data, itertools.repeat(AVAIL_WIDTH))
+
+        story_parts = []
+        headings = []
+        for item in content_items:
+            if item['type'] == 'heading':
+                heading = TOCHeading(item['text'], self.styles['CustomH1'])
+                heading.toc_key = f"toc{len(headings)}"
+                headings.append(heading)
+                story_parts.append(heading)
+            elif item['type'] == 'text':
+                clean_xml = clean_html_for_reportlab(item['text'])
+                story_parts += (Paragraph(clean_xml, self.styles['BodyText']), Spacer(1, SPACE_AFTER_P))
+            elif item['type'] == 'image':
+                if item['bytes']:
+                    img_buffer, width, height = next(fitted_images)
+                    story_parts += (Image(img_buffer, width=width, height=height), Spacer(1, SPACE_AFTER_IMG))
+
+        story = self.cover_page(metadata)
+        story.extend(self.toc_page(headings))
+        story.extend(story_parts)
+
+        doc.build(story, onFirstPage=self.draw_cover_footer, onLaterPages=self.draw_content_footer)